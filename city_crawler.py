@@ -3,6 +3,8 @@ import json
 import sys
 from typing import List, Dict, Optional
 
+from crawl_profiler import span
+
 
 class CityCrawler:
     def __init__(self, use_proxy=False, proxy_url="10.121.196.239:9090", verify_ssl=True, timeout=15):
@@ -28,16 +30,18 @@ class CityCrawler:
         }
 
         try:
-            resp = requests.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=self.timeout,
-                proxies=self.proxies,
-                verify=self.verify_ssl
-            )
+            with span("fetch_city_info", "network"):
+                resp = requests.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=self.timeout,
+                    proxies=self.proxies,
+                    verify=self.verify_ssl
+                )
             resp.raise_for_status()
-            return resp.json()
+            with span("fetch_city_info", "decode"):
+                return resp.json()
         except requests.RequestException as e:
             print(f"请求失败: {e}", file=sys.stderr)
             return None
@@ -0,0 +1,187 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class CrawlProfiler:
+    """记录爬取过程中各阶段耗时，导出 Chrome trace / Perfetto 可读取的 JSON 时间线"""
+
+    def __init__(self, use_cprofile=False, use_tracemalloc=False, top_n=20):
+        self.enabled = False
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.top_n = top_n
+        self.events: List[Dict] = []
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._cprofile = None
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._start) * 1e6
+
+    def start(self):
+        """开启性能分析"""
+        self.enabled = True
+        self._start = time.perf_counter()
+        self.events = []
+
+        if self.use_cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+        if self.use_tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+
+    def stop(self):
+        """停止性能分析（tracemalloc 保持运行，留给 print_summary 取快照）"""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self.enabled = False
+
+    def close(self):
+        """停止性能分析并释放 tracemalloc"""
+        self.stop()
+        if self.use_tracemalloc:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        """记录一个阶段的耗时，未开启时不做任何事"""
+        if not self.enabled:
+            yield
+            return
+
+        begin = self._now_us()
+        try:
+            yield
+        finally:
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": begin,
+                "dur": self._now_us() - begin,
+                "pid": self.pid,
+                "tid": threading.get_ident()
+            }
+            if args:
+                event["args"] = args
+            with self._lock:
+                self.events.append(event)
+
+    def export_chrome_trace(self, path: str) -> bool:
+        """导出为 Chrome trace 格式（chrome://tracing 或 ui.perfetto.dev 可直接打开）"""
+        trace = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms"
+        }
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False)
+            print(f"性能时间线已导出: {path}（共 {len(self.events)} 个 span）")
+            return True
+        except OSError as e:
+            print(f"导出性能时间线失败: {e}", file=sys.stderr)
+            return False
+
+    def stage_summary(self) -> Dict[Tuple[str, str], Dict]:
+        """按 (name, cat) 汇总次数、总耗时和自身耗时（毫秒）
+
+        span 会嵌套，自身耗时扣除了同一线程内直接子 span 的耗时，各项自身耗时相加不会重复计算
+        """
+        summary = {}
+        events_by_tid = {}
+        for event in self.events:
+            events_by_tid.setdefault(event["tid"], []).append(event)
+
+        for events in events_by_tid.values():
+            # 开始时间相同时外层 span 更长，排在前面
+            events.sort(key=lambda e: (e["ts"], -e["dur"]))
+            stack = []
+            for event in events:
+                end = event["ts"] + event["dur"]
+                while stack and stack[-1]["end"] <= event["ts"]:
+                    stack.pop()
+                if stack:
+                    stack[-1]["child_dur"] += event["dur"]
+                stack.append({"event": event, "end": end, "child_dur": 0.0})
+                item = summary.setdefault((event["name"], event["cat"]),
+                                          {"count": 0, "total_ms": 0.0, "self_ms": 0.0, "_frames": []})
+                item["count"] += 1
+                item["total_ms"] += event["dur"] / 1000
+                item["_frames"].append(stack[-1])
+
+        for item in summary.values():
+            frames = item.pop("_frames")
+            item["self_ms"] = sum(f["event"]["dur"] - f["child_dur"] for f in frames) / 1000
+        return summary
+
+    def print_summary(self):
+        """打印阶段汇总以及可选的 tracemalloc / cProfile 热点"""
+        summary = self.stage_summary()
+        if summary:
+            print("\n各阶段耗时汇总（按自身耗时排序）:")
+            for (name, cat), item in sorted(summary.items(), key=lambda kv: kv[1]["self_ms"], reverse=True):
+                print(f"  {cat:<8} {name:<32} 次数={item['count']:<6} "
+                      f"自身耗时={item['self_ms']:.1f}ms 总耗时={item['total_ms']:.1f}ms")
+
+        if self.use_tracemalloc:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                print(f"\ntracemalloc 内存分配热点（前 {self.top_n}）:")
+                for stat in snapshot.statistics("lineno")[:self.top_n]:
+                    print(f"  {stat}")
+                tracemalloc.stop()
+
+        if self._cprofile is not None:
+            import pstats
+            stats = pstats.Stats(self._cprofile, stream=sys.stdout)
+            # 自身耗时定位真正的热点；累计耗时的前几名通常是 main / crawl_all_* 等外层函数，仅作参考
+            print(f"\ncProfile 热点函数（按自身耗时前 {self.top_n}）:")
+            stats.sort_stats("tottime").print_stats(self.top_n)
+            print(f"\ncProfile 调用链（按累计耗时前 {self.top_n}）:")
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+
+
+# 全局性能分析实例（默认关闭）
+_profiler = CrawlProfiler()
+
+
+def enable_profiling(use_cprofile=False, use_tracemalloc=False, top_n=20) -> CrawlProfiler:
+    """开启全局性能分析，已在运行的实例会先被关闭"""
+    global _profiler
+    if _profiler.enabled:
+        _profiler.close()
+    _profiler = CrawlProfiler(use_cprofile=use_cprofile, use_tracemalloc=use_tracemalloc, top_n=top_n)
+    _profiler.start()
+    return _profiler
+
+
+def get_profiler() -> CrawlProfiler:
+    """获取全局性能分析实例"""
+    return _profiler
+
+
+def span(name: str, cat: str = "stage", **args):
+    """在全局性能分析实例上记录一个 span"""
+    return _profiler.span(name, cat, **args)
+
+
+def finish_profiling(trace_path: Optional[str] = "crawl_trace.json"):
+    """停止全局性能分析，导出时间线并打印汇总"""
+    if not _profiler.enabled:
+        return
+    _profiler.stop()
+    if trace_path:
+        _profiler.export_chrome_trace(trace_path)
+    _profiler.print_summary()
@@ -1,39 +1,119 @@
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
 import logging
 
+from crawl_profiler import span
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 生产者支持的压缩算法（lz4/zstd 需要额外安装 lz4 / zstandard 库）
+SUPPORTED_COMPRESSION_TYPES = (None, "gzip", "snappy", "lz4", "zstd")
+
+
+def _build_projection_tree(paths: List[str]) -> Dict:
+    """将路径列表转换为嵌套字典，叶子节点为空字典表示保留整个值"""
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = [p for p in path.split(".") if p]
+        for i, part in enumerate(parts):
+            if part in node and not node[part]:
+                # 上层路径已要求保留整个值
+                break
+            if i == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _apply_projection(data: Any, tree: Dict) -> Any:
+    """按投影树裁剪数据，不存在的路径直接忽略"""
+    if not tree:
+        return data
+    if isinstance(data, list):
+        return [_apply_projection(item, tree) for item in data]
+    if not isinstance(data, dict):
+        return data
+
+    projected = {}
+    for key, subtree in tree.items():
+        if key in data:
+            projected[key] = _apply_projection(data[key], subtree)
+    return projected
+
 
 class KafkaDataProducer:
-    def __init__(self, kafka_servers: list, topic: str):
+    def __init__(self, kafka_servers: list, topic: str, compression_type: Optional[str] = None,
+                 projection_specs: Optional[Dict[str, List[str]]] = None, compact_envelope: bool = False,
+                 measure_raw_size: bool = True):
+        if compression_type not in SUPPORTED_COMPRESSION_TYPES:
+            raise ValueError(f"不支持的压缩算法: {compression_type}，可选值: {SUPPORTED_COMPRESSION_TYPES}")
+
         self.kafka_servers = kafka_servers
         self.topic = topic
+        self.compression_type = compression_type
+        # 紧凑信封：省略空的 meta_json / data_html（下游需确认不依赖这两个字段）
+        self.compact_envelope = compact_envelope
+        # 统计投影前按旧格式序列化的大小，每条消息多一次完整序列化
+        self.measure_raw_size = measure_raw_size
         self.producer = None
         self.batch_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+        # 按 dc_name 配置的字段投影：只保留列出的路径，未配置的 dc_name 原样发送
+        # 路径以 "." 分隔，从 data_json 顶层开始；遇到列表时对每个元素应用剩余路径，上层路径会覆盖其下的子路径
+        # 预先构建各 dc_name 的投影树，避免每条消息重复解析路径
+        self.projection_trees = {
+            dc_name: _build_projection_tree(paths)
+            for dc_name, paths in (projection_specs or {}).items() if paths
+        }
+
+        # 消息体积统计（均为压缩前）：raw_bytes 为投影前按旧格式序列化的大小，sent_bytes 为实际序列化后的大小
+        self.size_stats = {"messages": 0, "raw_bytes": 0, "sent_bytes": 0}
+        # 生产者在最近采样窗口内的平均压缩率（压缩后/压缩前），关闭连接前读取
+        self.compression_rate = None
+
+    def _encode(self, message: Dict) -> bytes:
+        """按 dc_name 裁剪 data_json 并紧凑序列化"""
+        encoded = dict(message)
+        tree = self.projection_trees.get(message.get("dc_name"))
+        if tree:
+            encoded["data_json"] = _apply_projection(message.get("data_json"), tree)
+        if self.compact_envelope:
+            for key in ("meta_json", "data_html"):
+                if encoded.get(key) == "":
+                    del encoded[key]
+        return json.dumps(encoded, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+    def _record_size(self, message: Dict, value: bytes):
+        """记录一条已确认送达的消息的体积"""
+        self.size_stats["messages"] += 1
+        self.size_stats["sent_bytes"] += len(value)
+        if self.measure_raw_size:
+            self.size_stats["raw_bytes"] += len(json.dumps(message, ensure_ascii=False).encode('utf-8'))
+
     def connect(self) -> bool:
         """连接到Kafka集群"""
         try:
             self.producer = KafkaProducer(
                 bootstrap_servers=self.kafka_servers,
-                value_serializer=lambda v: json.dumps(v, ensure_ascii=False).encode('utf-8'),
+                compression_type=self.compression_type,
                 acks='all',
                 retries=3
             )
-            logger.info(f"成功连接到Kafka集群: {self.kafka_servers}")
+            logger.info(f"成功连接到Kafka集群: {self.kafka_servers}，压缩算法: {self.compression_type or 'none'}")
             return True
         except Exception as e:
             logger.error(f"连接Kafka失败: {e}")
             return False
 
     def create_message(self, domain_name: str, dc_name: str, data_json: Dict) -> Dict:
-        """创建标准格式的消息"""
+        """创建标准格式的消息（发送时再按 dc_name 配置裁剪 data_json）"""
         return {
             "domain_name": domain_name,
             "dc_name": dc_name,
@@ -44,6 +124,53 @@ class KafkaDataProducer:
             "dc_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 
+    def get_size_report(self) -> Dict[str, Any]:
+        """返回本次运行的消息体积统计"""
+        raw_bytes = self.size_stats["raw_bytes"] if self.measure_raw_size else None
+        sent_bytes = self.size_stats["sent_bytes"]
+        compressed_bytes = None
+        if self.compression_type and self.compression_rate:
+            compressed_bytes = int(sent_bytes * self.compression_rate)
+
+        # 分别统计投影/紧凑与压缩带来的节省，总节省以能得到的最大基准为准
+        projection_saved_bytes = raw_bytes - sent_bytes if raw_bytes is not None else None
+        compression_saved_bytes = sent_bytes - compressed_bytes if compressed_bytes is not None else None
+        saved_parts = [b for b in (projection_saved_bytes, compression_saved_bytes) if b is not None]
+        saved_bytes = sum(saved_parts) if saved_parts else None
+        base_bytes = raw_bytes if raw_bytes is not None else sent_bytes
+        return {
+            "messages": self.size_stats["messages"],
+            "raw_bytes": raw_bytes,
+            "sent_bytes": sent_bytes,
+            "compressed_bytes": compressed_bytes,
+            "projection_saved_bytes": projection_saved_bytes,
+            "compression_saved_bytes": compression_saved_bytes,
+            "saved_bytes": saved_bytes,
+            "saved_ratio": saved_bytes / base_bytes if saved_bytes is not None and base_bytes else None,
+            "compression_type": self.compression_type
+        }
+
+    def log_size_report(self):
+        """输出本次运行节省的字节数"""
+        report = self.get_size_report()
+        if not report["messages"]:
+            return
+        parts = [f"消息体积统计: 共 {report['messages']} 条"]
+        if report["raw_bytes"] is not None:
+            parts.append(f"原始 {report['raw_bytes']} 字节（压缩前）")
+        parts.append(f"投影/紧凑后 {report['sent_bytes']} 字节（压缩前）")
+        if report["projection_saved_bytes"] is not None:
+            parts.append(f"投影/紧凑节省 {report['projection_saved_bytes']} 字节")
+        if report["compressed_bytes"] is not None:
+            parts.append(f"{report['compression_type']} 压缩后约 {report['compressed_bytes']} 字节，"
+                         f"压缩节省约 {report['compression_saved_bytes']} 字节"
+                         f"（按生产者最近采样窗口的平均压缩率估算，非全程统计）")
+        elif report["compression_type"]:
+            parts.append(f"{report['compression_type']} 压缩率未知，未计入压缩节省")
+        if report["saved_bytes"] is not None:
+            parts.append(f"共节省 {report['saved_bytes']} 字节 ({report['saved_ratio']:.1%})")
+        logger.info("，".join(parts))
+
     def send_message(self, message: Dict) -> bool:
         """发送单条消息到Kafka"""
         if not self.producer:
@@ -51,9 +178,13 @@ class KafkaDataProducer:
             return False
 
         try:
-            future = self.producer.send(self.topic, message)
+            value = self._encode(message)
+            with span("kafka_send", "kafka", dc_name=message.get("dc_name")):
+                future = self.producer.send(self.topic, value)
             # 等待消息发送确认
-            record_metadata = future.get(timeout=10)
+            with span("kafka_ack", "kafka", dc_name=message.get("dc_name")):
+                record_metadata = future.get(timeout=10)
+            self._record_size(message, value)
             logger.debug(
                 f"消息发送成功: topic={record_metadata.topic}, partition={record_metadata.partition}, offset={record_metadata.offset}")
             return True
@@ -77,18 +208,35 @@ class KafkaDataProducer:
 
         return success_count
 
+    def _read_compression_rate(self) -> Optional[float]:
+        """读取生产者最近采样窗口（约 30~60 秒）的平均压缩率（压缩后/压缩前），不可用时返回 None"""
+        if not self.compression_type:
+            return None
+        try:
+            rate = self.producer.metrics().get("producer-metrics", {}).get("compression-rate-avg")
+        except Exception:
+            return None
+        # 没有样本时 kafka-python 返回 NaN 或负数
+        if rate is None or rate != rate or rate <= 0:
+            return None
+        return rate
+
     def close(self):
         """关闭生产者连接"""
         if self.producer:
+            self.compression_rate = self._read_compression_rate()
             self.producer.close()
             logger.info("Kafka生产者连接已关闭")
+        self.log_size_report()
 
 
 # 全局Kafka生产者实例
 _kafka_producer = None
 
 
-def init_kafka_producer(kafka_servers: list = None, topic: str = None) -> KafkaDataProducer:
+def init_kafka_producer(kafka_servers: list = None, topic: str = None, compression_type: Optional[str] = None,
+                        projection_specs: Optional[Dict[str, List[str]]] = None, compact_envelope: bool = False,
+                        measure_raw_size: bool = True) -> KafkaDataProducer:
     """初始化全局Kafka生产者"""
     global _kafka_producer
 
@@ -98,7 +246,9 @@ def init_kafka_producer(kafka_servers: list = None, topic: str = None) -> KafkaD
     if topic is None:
         topic = 'topic_idc_raw_data_base'
 
-    _kafka_producer = KafkaDataProducer(kafka_servers, topic)
+    _kafka_producer = KafkaDataProducer(kafka_servers, topic, compression_type=compression_type,
+                                        projection_specs=projection_specs, compact_envelope=compact_envelope,
+                                        measure_raw_size=measure_raw_size)
     if _kafka_producer.connect():
         return _kafka_producer
     else:
@@ -5,6 +5,8 @@ import sys
 import os
 from typing import List, Dict, Optional
 
+from crawl_profiler import span
+
 # 导入城市爬虫功能
 try:
     from city_crawler import CityCrawler, get_cities_list
@@ -68,17 +70,19 @@ class StationCrawler:
         }
 
         try:
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=self.timeout,
-                proxies=self.proxies,
-                verify=self.verify_ssl
-            )
+            with span("fetch_stations_for_city", "network", cityCode=city_info["cityCode"]):
+                response = requests.post(
+                    self.base_url,
+                    headers=self.headers,
+                    json=payload,
+                    timeout=self.timeout,
+                    proxies=self.proxies,
+                    verify=self.verify_ssl
+                )
             response.raise_for_status()
 
-            result = response.json()
+            with span("fetch_stations_for_city", "decode", cityCode=city_info["cityCode"]):
+                result = response.json()
             if result.get("code") == 10000:
                 return result
             else:
@@ -103,7 +107,8 @@ class StationCrawler:
             city_name = city["cityName"]
             print(f"[{i}/{total_cities}] 正在获取 {city_name} 的站点信息...")
 
-            result = self.fetch_stations_for_city(city)
+            with span("fetch_stations_for_city", "request", cityCode=city["cityCode"]):
+                result = self.fetch_stations_for_city(city)
             if result:
                 all_stations[city["cityCode"]] = {
                     "city_info": {
@@ -122,7 +127,8 @@ class StationCrawler:
                             "city_info": all_stations[city["cityCode"]]["city_info"],
                             "station_data": result
                         }
-                        ok = send_station_list_message(payload)
+                        with span("send_station_list_message", "sink", cityCode=city["cityCode"]):
+                            ok = send_station_list_message(payload)
                         if not ok:
                             print(f"  × 发送 {city_name} 站点列表到 Kafka 失败")
                     except Exception as _:
@@ -132,7 +138,8 @@ class StationCrawler:
 
             # 添加延迟
             if i < total_cities:
-                time.sleep(delay)
+                with span("crawl_all_cities.sleep", "wait"):
+                    time.sleep(delay)
 
         return all_stations
 
@@ -140,7 +147,8 @@ class StationCrawler:
         """获取所有城市的站点信息（包含城市数据获取）"""
         # 获取城市列表
         print("正在获取城市列表...")
-        cities = get_cities_list(use_proxy=self.use_proxy, verify_ssl=self.verify_ssl, timeout=self.timeout)
+        with span("get_cities_list"):
+            cities = get_cities_list(use_proxy=self.use_proxy, verify_ssl=self.verify_ssl, timeout=self.timeout)
 
         if not cities:
             print("获取城市信息失败，程序退出")
@@ -149,7 +157,8 @@ class StationCrawler:
         print(f"成功获取 {len(cities)} 个城市信息")
 
         # 开始爬取所有城市的站点信息
-        return self.crawl_all_cities(cities, delay=0.5)
+        with span("crawl_all_cities"):
+            return self.crawl_all_cities(cities, delay=0.5)
 
 
 def get_stations_data(use_proxy=False, verify_ssl=True, timeout=15) -> Dict[str, Dict]:
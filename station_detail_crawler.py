@@ -5,6 +5,8 @@ import sys
 import os
 from typing import Dict, List, Optional
 
+from crawl_profiler import span, enable_profiling, finish_profiling
+
 # 导入站点爬虫功能
 try:
     from station_crawler import get_stations_data
@@ -27,6 +29,21 @@ except ImportError:
     close_kafka_producer = None
     send_station_detail_message = None
 
+# Kafka 消息字段投影（按 dc_name 只保留列出的路径）
+# 注意：这会改变下发的消息结构——站点详情只保留 station_info 的 stationId/cityCode，
+# 两类消息均不再包含接口返回的 code/msg（爬取时已校验），下游需确认不依赖这些字段
+KAFKA_PROJECTION_SPECS = {
+    "chocolateswap_station_list": [
+        "city_info",
+        "station_data.data"
+    ],
+    "chocolateswap_station_detail": [
+        "station_info.stationId",
+        "station_info.cityCode",
+        "detail_data.data"
+    ]
+}
+
 
 class StationDetailCrawler:
     def __init__(self, use_proxy=False, proxy_url="10.121.196.239:9090", verify_ssl=True, timeout=15):
@@ -72,17 +89,19 @@ class StationDetailCrawler:
         }
 
         try:
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=self.timeout,
-                proxies=self.proxies,
-                verify=self.verify_ssl
-            )
+            with span("fetch_station_detail", "network", stationId=station_info["stationId"]):
+                response = requests.post(
+                    self.base_url,
+                    headers=self.headers,
+                    json=payload,
+                    timeout=self.timeout,
+                    proxies=self.proxies,
+                    verify=self.verify_ssl
+                )
             response.raise_for_status()
 
-            result = response.json()
+            with span("fetch_station_detail", "decode", stationId=station_info["stationId"]):
+                result = response.json()
             if result.get("code") == 10000:
                 return result
             else:
@@ -164,7 +183,8 @@ class StationDetailCrawler:
                     "stationName": station_name
                 }
 
-                result = self.fetch_station_detail(station_info)
+                with span("fetch_station_detail", "request", stationId=station_id):
+                    result = self.fetch_station_detail(station_info)
                 if result:
                     all_station_details[station_id] = {
                         "station_info": station_info,
@@ -179,7 +199,8 @@ class StationDetailCrawler:
                                 "station_info": station_info,
                                 "detail_data": result
                             }
-                            ok = send_station_detail_message(payload)
+                            with span("send_station_detail_message", "sink", stationId=station_id):
+                                ok = send_station_detail_message(payload)
                             if not ok:
                                 print(f"  × 发送站点 {station_name} 明细到 Kafka 失败")
                         except Exception as _:
@@ -189,7 +210,8 @@ class StationDetailCrawler:
 
                 # 添加延迟
                 if current_station < total_stations:
-                    time.sleep(delay)
+                    with span("crawl_all_stations.sleep", "wait"):
+                        time.sleep(delay)
 
         return all_station_details
 
@@ -197,11 +219,12 @@ class StationDetailCrawler:
         """获取所有站点的明细信息（包含站点数据获取）"""
         # 获取站点列表数据
         print("正在获取站点列表数据...")
-        stations_data = get_stations_data(
-            use_proxy=self.use_proxy,
-            verify_ssl=self.verify_ssl,
-            timeout=self.timeout
-        )
+        with span("get_stations_data"):
+            stations_data = get_stations_data(
+                use_proxy=self.use_proxy,
+                verify_ssl=self.verify_ssl,
+                timeout=self.timeout
+            )
 
         if not stations_data:
             print("获取站点数据失败，程序退出")
@@ -210,40 +233,60 @@ class StationDetailCrawler:
         print(f"成功获取 {len(stations_data)} 个城市的站点数据")
 
         # 开始爬取所有站点的明细信息
-        return self.crawl_all_stations(stations_data, delay=0.3)
+        with span("crawl_all_stations"):
+            return self.crawl_all_stations(stations_data, delay=0.3)
 
 
-def main():
-    """主函数：获取所有站点的明细信息"""
-    # 创建爬虫实例
-    crawler = StationDetailCrawler(
-        use_proxy=False,
-        proxy_url="10.121.196.239:9090",
-        verify_ssl=True,
-        timeout=15
-    )
+def main(profile=False, trace_path="crawl_trace.json", use_cprofile=False, use_tracemalloc=False):
+    """主函数：获取所有站点的明细信息
 
-    # 初始化 Kafka 生产者（如果可用）
-    if init_kafka_producer is not None:
-        init_kafka_producer()
+    profile=True 时记录各阶段耗时并导出 Chrome trace / Perfetto 时间线
+    """
+    if profile:
+        enable_profiling(use_cprofile=use_cprofile, use_tracemalloc=use_tracemalloc)
 
-    # 获取所有站点详情数据
-    all_station_details = crawler.get_all_station_details()
+    try:
+        # 创建爬虫实例
+        crawler = StationDetailCrawler(
+            use_proxy=False,
+            proxy_url="10.121.196.239:9090",
+            verify_ssl=True,
+            timeout=15
+        )
 
-    # 统计信息
-    if all_station_details:
-        successful_stations = len(all_station_details)
-        print(f"\n爬取完成！成功获取 {successful_stations} 个站点的明细信息")
+        # 初始化 Kafka 生产者（如果可用），gzip 无需额外依赖
+        if init_kafka_producer is not None:
+            init_kafka_producer(compression_type="gzip", projection_specs=KAFKA_PROJECTION_SPECS,
+                                measure_raw_size=True)
 
-        # 可以在这里添加数据保存或进一步处理的逻辑
-        return all_station_details
-    else:
-        print("没有成功获取任何站点的明细信息")
-        return {}
+        # 获取所有站点详情数据
+        all_station_details = crawler.get_all_station_details()
+
+        # 统计信息
+        if all_station_details:
+            successful_stations = len(all_station_details)
+            print(f"\n爬取完成！成功获取 {successful_stations} 个站点的明细信息")
+
+            # 可以在这里添加数据保存或进一步处理的逻辑
+            return all_station_details
+        else:
+            print("没有成功获取任何站点的明细信息")
+            return {}
+    finally:
+        # 爬取异常时同样导出时间线
+        if profile:
+            finish_profiling(trace_path)
 
 
 if __name__ == "__main__":
-    result = main()
+    # 通过环境变量开启性能分析：CRAWL_PROFILE=1，CRAWL_PROFILE_CPROFILE=1，CRAWL_PROFILE_TRACEMALLOC=1
+    # 时间线输出路径：CRAWL_PROFILE_TRACE（默认 crawl_trace.json）
+    result = main(
+        profile=os.environ.get("CRAWL_PROFILE") == "1",
+        trace_path=os.environ.get("CRAWL_PROFILE_TRACE", "crawl_trace.json"),
+        use_cprofile=os.environ.get("CRAWL_PROFILE_CPROFILE") == "1",
+        use_tracemalloc=os.environ.get("CRAWL_PROFILE_TRACEMALLOC") == "1"
+    )
     # 关闭 Kafka 生产者（如果可用）
     if close_kafka_producer is not None:
         try:
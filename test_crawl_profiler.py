@@ -0,0 +1,106 @@
+import json
+
+import crawl_profiler
+from crawl_profiler import CrawlProfiler
+
+
+def _event(name, ts, dur, cat="stage", tid=1):
+    return {"name": name, "cat": cat, "ph": "X", "ts": ts, "dur": dur, "pid": 1, "tid": tid}
+
+
+def test_self_time_subtracts_direct_children_only():
+    profiler = CrawlProfiler()
+    # outer 包含 request，request 包含 network / decode；sleep 与 request 为兄弟
+    profiler.events = [
+        _event("network", 10, 40, "network"),
+        _event("decode", 50, 10, "decode"),
+        _event("request", 10, 60, "request"),
+        _event("sleep", 70, 20, "wait"),
+        _event("outer", 0, 100),
+    ]
+
+    summary = profiler.stage_summary()
+    assert summary[("outer", "stage")]["total_ms"] == 0.1
+    assert abs(summary[("outer", "stage")]["self_ms"] - 0.02) < 1e-9
+    assert abs(summary[("request", "request")]["self_ms"] - 0.01) < 1e-9
+    assert summary[("network", "network")]["self_ms"] == 0.04
+    assert summary[("sleep", "wait")]["self_ms"] == 0.02
+    assert abs(sum(item["self_ms"] for item in summary.values()) - 0.1) < 1e-9
+
+
+def test_same_start_longer_span_is_parent():
+    profiler = CrawlProfiler()
+    profiler.events = [_event("child", 0, 30), _event("parent", 0, 50)]
+
+    summary = profiler.stage_summary()
+    assert summary[("parent", "stage")]["self_ms"] == 0.02
+    assert summary[("child", "stage")]["self_ms"] == 0.03
+
+
+def test_spans_on_other_threads_are_not_children():
+    profiler = CrawlProfiler()
+    profiler.events = [_event("a", 0, 50, tid=1), _event("b", 10, 20, tid=2)]
+
+    summary = profiler.stage_summary()
+    assert summary[("a", "stage")]["self_ms"] == 0.05
+    assert summary[("b", "stage")]["self_ms"] == 0.02
+
+
+def test_span_is_noop_when_disabled():
+    profiler = CrawlProfiler()
+    with profiler.span("x"):
+        pass
+    assert profiler.events == []
+
+
+def test_span_records_event_when_enabled():
+    profiler = CrawlProfiler()
+    profiler.start()
+    with profiler.span("x", "network", cityCode="1"):
+        pass
+    profiler.stop()
+
+    (event,) = profiler.events
+    assert event["name"] == "x"
+    assert event["cat"] == "network"
+    assert event["args"] == {"cityCode": "1"}
+    assert event["dur"] >= 0
+
+
+def test_export_chrome_trace_writes_trace_events(tmp_path):
+    profiler = CrawlProfiler()
+    profiler.start()
+    with profiler.span("outer"):
+        with profiler.span("inner", "decode"):
+            pass
+    profiler.stop()
+
+    path = tmp_path / "trace.json"
+    assert profiler.export_chrome_trace(str(path))
+
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    assert [e["name"] for e in trace["traceEvents"]] == ["inner", "outer"]
+    for event in trace["traceEvents"]:
+        assert event["ph"] == "X"
+        assert isinstance(event["ts"], (int, float))
+        assert isinstance(event["dur"], (int, float))
+
+
+def test_finish_profiling_does_nothing_when_not_enabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawl_profiler, "_profiler", CrawlProfiler())
+    path = tmp_path / "trace.json"
+
+    crawl_profiler.finish_profiling(str(path))
+    assert not path.exists()
+
+
+def test_finish_profiling_exports_enabled_profiler(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawl_profiler, "_profiler", CrawlProfiler())
+    crawl_profiler.enable_profiling()
+    with crawl_profiler.span("x"):
+        pass
+
+    path = tmp_path / "trace.json"
+    crawl_profiler.finish_profiling(str(path))
+    assert not crawl_profiler.get_profiler().enabled
+    assert len(json.loads(path.read_text(encoding="utf-8"))["traceEvents"]) == 1
@@ -0,0 +1,153 @@
+import json
+import sys
+import types
+
+try:
+    import kafka  # noqa: F401
+except ImportError:
+    # 测试只用到假的生产者，未安装 kafka-python 时注册一个最小的替身模块
+    _kafka = types.ModuleType("kafka")
+    _kafka.KafkaProducer = object
+    _kafka_errors = types.ModuleType("kafka.errors")
+    _kafka_errors.KafkaError = type("KafkaError", (Exception,), {})
+    _kafka.errors = _kafka_errors
+    sys.modules["kafka"] = _kafka
+    sys.modules["kafka.errors"] = _kafka_errors
+
+from kafka.errors import KafkaError
+
+from msg2kafka import KafkaDataProducer, _apply_projection, _build_projection_tree
+
+
+class _FakeFuture:
+    topic = "t"
+    partition = 0
+    offset = 0
+
+    def __init__(self, fail_ack=False):
+        self.fail_ack = fail_ack
+
+    def get(self, timeout=None):
+        if self.fail_ack:
+            raise KafkaError("ack timed out")
+        return self
+
+
+class _FakeProducer:
+    def __init__(self, fail=False, fail_ack=False):
+        self.fail = fail
+        self.fail_ack = fail_ack
+        self.sent = []
+
+    def send(self, topic, value):
+        if self.fail:
+            raise RuntimeError("send failed")
+        self.sent.append(value)
+        return _FakeFuture(fail_ack=self.fail_ack)
+
+
+def _project(data, paths):
+    return _apply_projection(data, _build_projection_tree(paths))
+
+
+def test_parent_path_keeps_whole_value_in_any_order():
+    data = {"a": {"b": 1, "c": 2}, "d": 3}
+    assert _project(data, ["a", "a.b"]) == {"a": {"b": 1, "c": 2}}
+    assert _project(data, ["a.b", "a"]) == {"a": {"b": 1, "c": 2}}
+
+
+def test_lists_are_projected_per_element():
+    data = {"list": [{"id": 1, "x": 1}, {"id": 2}, {"x": 3}]}
+    assert _project(data, ["list.id"]) == {"list": [{"id": 1}, {"id": 2}, {}]}
+
+
+def test_missing_paths_are_ignored():
+    assert _project({"a": 1}, ["b.c", "a"]) == {"a": 1}
+
+
+def test_send_applies_projection_by_dc_name():
+    producer = KafkaDataProducer([], "t", projection_specs={"dc": ["keep"]}, compact_envelope=True)
+    producer.producer = _FakeProducer()
+
+    assert producer.send_message(producer.create_message("d", "dc", {"keep": 1, "drop": 2}))
+    assert producer.send_message(producer.create_message("d", "other", {"keep": 1, "drop": 2}))
+
+    first, second = [json.loads(v) for v in producer.producer.sent]
+    assert first["data_json"] == {"keep": 1}
+    assert second["data_json"] == {"keep": 1, "drop": 2}
+    assert "meta_json" not in first and "data_html" not in first
+
+
+def test_no_projection_by_default():
+    producer = KafkaDataProducer([], "t")
+    producer.producer = _FakeProducer()
+    data = {"station_info": {"stationId": 1, "stationName": "x"}, "detail_data": {"code": 10000}}
+
+    assert producer.send_message(producer.create_message("d", "chocolateswap_station_detail", data))
+    assert json.loads(producer.producer.sent[0])["data_json"] == data
+
+
+def test_unsent_messages_are_not_counted():
+    producer = KafkaDataProducer([], "t")
+    producer.create_message("d", "dc", {"a": 1})
+    assert not producer.send_message(producer.create_message("d", "dc", {"a": 1}))
+
+    producer.producer = _FakeProducer(fail=True)
+    assert not producer.send_message(producer.create_message("d", "dc", {"a": 1}))
+
+    report = producer.get_size_report()
+    assert report["messages"] == 0
+    assert report["raw_bytes"] == 0
+    assert report["sent_bytes"] == 0
+
+
+def test_failed_ack_is_not_counted():
+    producer = KafkaDataProducer([], "t")
+    producer.producer = _FakeProducer(fail_ack=True)
+    assert not producer.send_message(producer.create_message("d", "dc", {"a": 1}))
+
+    report = producer.get_size_report()
+    assert report["messages"] == 0
+    assert report["raw_bytes"] == 0
+    assert report["sent_bytes"] == 0
+
+
+def test_size_report_counts_raw_and_sent_bytes():
+    producer = KafkaDataProducer([], "t", projection_specs={"dc": ["keep"]})
+    producer.producer = _FakeProducer()
+    message = producer.create_message("d", "dc", {"keep": 1, "drop": "x" * 100})
+    assert producer.send_message(message)
+
+    report = producer.get_size_report()
+    raw = len(json.dumps(message, ensure_ascii=False).encode("utf-8"))
+    assert report["messages"] == 1
+    assert report["raw_bytes"] == raw
+    assert report["sent_bytes"] == len(producer.producer.sent[0])
+    assert report["projection_saved_bytes"] == raw - report["sent_bytes"]
+    assert report["saved_bytes"] == report["projection_saved_bytes"]
+    assert report["compressed_bytes"] is None
+    assert report["compression_saved_bytes"] is None
+
+
+def test_size_report_uses_compression_rate():
+    producer = KafkaDataProducer([], "t", compression_type="gzip")
+    producer.producer = _FakeProducer()
+    assert producer.send_message(producer.create_message("d", "dc", {"a": 1}))
+    producer.compression_rate = 0.5
+
+    report = producer.get_size_report()
+    assert report["compressed_bytes"] == int(report["sent_bytes"] * 0.5)
+    assert report["compression_saved_bytes"] == report["sent_bytes"] - report["compressed_bytes"]
+    assert report["saved_bytes"] == report["raw_bytes"] - report["compressed_bytes"]
+
+
+def test_compression_savings_reported_without_raw_size():
+    producer = KafkaDataProducer([], "t", compression_type="gzip", measure_raw_size=False)
+    producer.producer = _FakeProducer()
+    assert producer.send_message(producer.create_message("d", "dc", {"a": 1}))
+    producer.compression_rate = 0.5
+
+    report = producer.get_size_report()
+    assert report["raw_bytes"] is None
+    assert report["projection_saved_bytes"] is None
+    assert report["saved_bytes"] == report["compression_saved_bytes"] > 0